@@ -9,128 +9,272 @@ and creates a graph showing their relationships using Graphviz.
 import subprocess
 import sys
 import re
-from pathlib import Path
-from typing import Dict, List, Tuple, Set
+import threading
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterator, List, TextIO, Tuple
+
+
+# Characters that are replaced by '_' in branch and tag node IDs
+UNSAFE_ID_CHARS = re.compile(r'[^a-zA-Z0-9_]')
+
+# Pipe buffer size for the `git cat-file --batch` process
+CAT_FILE_BUFFER_SIZE = 1 << 20
+
+# Graphviz node attributes per node type
+NODE_STYLES = {
+    'tag_ref': 'fillcolor="#FF69B4", shape="cds"',
+    'tag': 'fillcolor="#FF69B4", shape="note"',
+    'commit': 'fillcolor="#FFD700", shape="ellipse"',
+    'tree': 'fillcolor="#90EE90", shape="folder"',
+    'blob': 'fillcolor="#87CEEB", shape="cylinder"',
+}
+
+# Constant tail of a node statement per node type, following the label text
+NODE_SUFFIXES = {node_type: f'", {style}];\n' for node_type, style in NODE_STYLES.items()}
+
+# Git object sections in output order: (type, comment, rank all nodes at the same level)
+OBJECT_SECTIONS = (
+    ('tag', 'Tag objects', False),
+    ('commit', 'Commit objects', True),
+    ('tree', 'Tree objects', False),
+    ('blob', 'Blob objects', True),
+)
+
+# Graphviz node attributes per branch type
+BRANCH_STYLES = {
+    'local': 'fillcolor="#FFB6C1", shape="cds"',
+    'remote': 'fillcolor="#DDA0DD", shape="cds"',
+    'head': 'fillcolor="#FF6347", shape="cds", penwidth="3"',
+    # Missing (non-existent) local branch is drawn with a dashed outline
+    'local_missing': 'fillcolor="#FFEFD5", shape="cds", style="dashed,filled"',
+    # Missing remote branch is drawn with a dashed outline (different tint)
+    'remote_missing': 'fillcolor="#FFF0F5", shape="cds", style="dashed,filled"',
+}
+
+# Graphviz edge attributes per relationship type
+EDGE_STYLES = {
+    'parent': 'label="parent", color="red"',
+    'tree': 'color="green"',
+    'object': 'label="tag (obj)", color="purple"',
+    'local': 'label="local", color="orange"',
+    'remote': 'label="remote", color="brown"',
+    'local_missing': 'label="local (missing)", color="orange", style="dashed"',
+    'head': 'color="red", penwidth="2"',
+    'tracks': 'label="tracks", style="dashed", color="black"',
+    'tag_ref': 'label="tag (ref)", color="purple"',
+}
+
+# Relationship types in a fixed order, so edges can store a small index instead of the name
+EDGE_TYPES = tuple(EDGE_STYLES)
+EDGE_TYPE_INDEX = {rel_type: i for i, rel_type in enumerate(EDGE_TYPES)}
+
+# Constant tails of an edge statement per relationship type, indexed like EDGE_TYPES:
+# (after the target node id, after the label text of a labelled edge)
+EDGE_SUFFIXES = tuple(
+    (f' [{EDGE_STYLES[rel_type]}];\n', f'", {EDGE_STYLES[rel_type]}];\n')
+    for rel_type in EDGE_TYPES
+)
+
+
+@lru_cache(maxsize=None)
+def escape_label(text: str) -> str:
+    """
+    Escape text for use inside a double-quoted DOT string.
+    Cached, since the same file names occur in many trees.
+    """
+    return text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _TeeWriter:
+    """
+    Minimal text stream that writes everything to several streams.
+    A stream whose reader went away (broken pipe) is dropped, so the remaining
+    streams still receive the complete output.
+    """
+
+    def __init__(self, streams: List[TextIO]):
+        self.streams = list(streams)
+
+    def write(self, text: str) -> None:
+        for stream in self.streams:
+            try:
+                stream.write(text)
+            except BrokenPipeError:
+                self.streams = [s for s in self.streams if s is not stream]
+                if not self.streams:
+                    raise
 
 
 class GitObjectGraphVisualizer:
     def __init__(self):
         """Initialize the visualizer."""
-        self.nodes: Dict[str, Tuple[str, str, str]] = {}  # node_id -> (type, label, name)
-        self.edges: List[Tuple] = []  # list of (from, to, rel_type, name_label) or (from, to, rel_type) tuples
-        self.visited: Set[str] = set()  # track visited objects
+        self.nodes: Dict[str, Tuple[str, str, str]] = {}  # node_id -> (type, label, name) for branches and tag refs
+        # Edges are stored as parallel lists (from, to, rel_type, name_label) rather than one tuple per edge
+        self.edge_from: List[str] = []
+        self.edge_to: List[str] = []
+        self.edge_types = array('B')  # index into EDGE_TYPES
+        self.edge_labels: List[str] = []
         self.object_types: Dict[str, str] = {}  # hash -> type mapping
+        self.objects_by_type: Dict[str, List[str]] = {}  # type -> hashes, in listing order; one node per hash
         self.object_names: Dict[str, str] = {}  # hash -> name mapping
+        self._node_ids: Dict[str, str] = {}  # hash -> node_id cache
+        self._branch_node_ids: Dict[Tuple[str, str], str] = {}  # (branch_name, branch_type) -> node_id cache
+        self._entry_names: Dict[bytes, str] = {}  # raw tree entry name -> decoded name cache
         self.branches: List[Tuple[str, str, str]] = []  # list of (branch_name, branch_type, commit_hash)
         self.upstreams: Dict[str, str] = {}  # local_branch -> upstream (remote) branch name
         self.index_entries: List[Tuple[str, str]] = []  # list of (short_hash, path) from git index
         self.tag_refs: List[Tuple[str, str]] = []  # list of (tag_name, commit_hash) for tag references
-        
-    def get_all_git_objects(self) -> List[str]:
-        """Get all object hashes known by git."""
+        # Single long-running `git cat-file --batch` process used to read object contents,
+        # instead of spawning a new git process for every object. The large buffer lets
+        # one read() system call take in many small tree and commit objects at once.
+        self._cat_file = subprocess.Popen(
+            ['git', 'cat-file', '--batch'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=CAT_FILE_BUFFER_SIZE
+        )
+        self._cat_writer: threading.Thread = None  # thread feeding requests to cat-file
+
+    def _abort_cat_file(self) -> None:
+        """
+        Stop the `git cat-file --batch` process before all responses are read.
+        Closing its output and killing it makes a pending request write fail, so a
+        writer thread blocked on a full pipe can finish.
+        """
+        self._cat_file.stdout.close()
+        self._cat_file.kill()
+
+    def close(self) -> None:
+        """Shut down the persistent `git cat-file --batch` process."""
+        if self._cat_file.stdin and not self._cat_file.stdin.closed:
+            writer = self._cat_writer
+            if writer is not None and writer.is_alive():
+                # Processing stopped while requests were still being written; the
+                # writer may hold the stdin lock, blocked on a full pipe
+                self._abort_cat_file()
+                writer.join()
+            try:
+                self._cat_file.stdin.close()
+            except OSError:
+                # Requests still buffered cannot be delivered to a stopped git
+                pass
+            self._cat_file.wait()
+            self._cat_file.stdout.close()
+
+    def _read_object(self) -> Tuple[str, bytes]:
+        """
+        Read the next response from the `git cat-file --batch` process.
+        Returns tuple: (obj_type, content). The type is "unknown" if git cannot read the object.
+        """
+        # Header format is "hash type size", or "hash missing" for unknown objects
+        header = self._cat_file.stdout.readline().split()
+        if len(header) != 3:
+            return "unknown", b''
+
+        obj_type = header[1].decode()
+        content = self._cat_file.stdout.read(int(header[2]))
+        self._cat_file.stdout.read(1)  # skip the newline terminating the content
+        return obj_type, content
+
+    def _cat_many(self, git_hashes: List[str]) -> Iterator[Tuple[str, str, bytes]]:
+        """
+        Read objects through the persistent `git cat-file --batch` process.
+        Requests are written from a separate thread while responses are being read,
+        so git always has the next objects queued instead of waiting for each round trip.
+        Yields tuples: (hash, obj_type, content)
+        """
+        def write_requests():
+            try:
+                for git_hash in git_hashes:
+                    self._cat_file.stdin.write(f'{git_hash}\n'.encode())
+                self._cat_file.stdin.flush()
+            except OSError:
+                # git exited early; the reader sees end of output
+                pass
+
+        writer = self._cat_writer = threading.Thread(target=write_requests, daemon=True)
+        writer.start()
+        completed = False
         try:
-            result = subprocess.run(
-                ['git', 'cat-file', '--batch-check', '--batch-all-objects'],
-                input='',
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                check=True
-            )
-        except subprocess.CalledProcessError as e:
-            print(f"Error getting git objects: {e.stderr}", file=sys.stderr)
-            return []
-        
-        objects = set()
-        for line in result.stdout.strip().split('\n'):
-            if not line:
-                continue
-            # Format is "hash type size"
-            parts = line.split()
-            if parts:
-                objects.add(parts[0])
-        
-        return list(objects)
+            for git_hash in git_hashes:
+                obj_type, content = self._read_object()
+                yield git_hash, obj_type, content
+            completed = True
+        finally:
+            if not completed:
+                # Stopped early (exception, Ctrl-C or an abandoned generator): git may be
+                # blocked on its full output pipe, and the writer on git's full input pipe
+                self._abort_cat_file()
+            writer.join()
+
+    def get_all_git_objects(self) -> None:
+        """
+        Get all object hashes known by git.
+        Records the type of every object in self.object_types and groups the
+        hashes by type in self.objects_by_type.
+        """
+        # --unordered lists objects in pack order, which also makes reading their
+        # contents afterwards cheaper; --buffer avoids flushing after every line
+        # Lines are read as they arrive, so the whole listing is never held in memory
+        object_types = self.object_types
+        objects_by_type = self.objects_by_type
+        with subprocess.Popen(
+            ['git', 'cat-file', '--batch-check', '--batch-all-objects', '--unordered', '--buffer'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True
+        ) as proc:
+            # cat-file lists each object only once, so the listing order can be kept
+            for line in proc.stdout:
+                # Format is "hash type size"
+                obj_hash, obj_type, _ = line.split()
+                # Interned, as each hash is used as key in several dicts and sets
+                obj_hash = sys.intern(obj_hash)
+                object_types[obj_hash] = obj_type
+                bucket = objects_by_type.get(obj_type)
+                if bucket is None:
+                    bucket = objects_by_type[obj_type] = []
+                bucket.append(obj_hash)
+            error = proc.stderr.read()
+        
+        if proc.returncode != 0:
+            print(f"Error getting git objects: {error}", file=sys.stderr)
+            object_types.clear()
+            objects_by_type.clear()
     
     def get_all_branches(self) -> None:
         """
-        Get all local and remote branches and their commit references.
-        Stores results in self.branches as (name, type, commit_hash).
+        Get all local and remote branches, their commit references and upstreams.
+        Stores results in self.branches as (name, type, commit_hash) and
+        self.upstreams as local_branch -> upstream.
         """
         try:
-            # Get local branches
+            # One for-each-ref call lists every branch with its target and upstream
             result = subprocess.run(
-                ['git', 'branch', '--format=%(refname:short)'],
+                ['git', 'for-each-ref',
+                 '--format=%(refname)\t%(refname:short)\t%(objectname)\t%(objecttype)\t%(upstream:short)',
+                 'refs/heads', 'refs/remotes'],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 universal_newlines=True,
                 check=True
             )
-            for branch_name in result.stdout.strip().split('\n'):
-                if not branch_name or branch_name.startswith('('):
-                    # Skip empty lines and the "(HEAD detached at ...)" line
-                    continue
-                # Get full commit hash for this branch
-                hash_result = subprocess.run(
-                    ['git', 'rev-parse', f'{branch_name}^{{commit}}'],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    universal_newlines=True,
-                    check=True
-                )
-                commit_hash = hash_result.stdout.strip()
-                if commit_hash:
-                    self.branches.append((branch_name, 'local', commit_hash))
         except subprocess.CalledProcessError:
-            pass
+            return
 
-        # Try to discover upstream (tracking) relationships for local branches
-        try:
-            result = subprocess.run(
-                ['git', 'for-each-ref', '--format=%(refname:short) %(upstream:short)', 'refs/heads'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                check=True
-            )
-            for line in result.stdout.strip().split('\n'):
-                if not line:
-                    continue
-                parts = line.split()
-                # Format: "local_branch upstream_branch" (upstream may be absent)
-                if len(parts) >= 2:
-                    local = parts[0]
-                    upstream = parts[1]
-                    if upstream:
-                        self.upstreams[local] = upstream
-        except subprocess.CalledProcessError:
-            pass
-        
-        try:
-            # Get remote branches
-            result = subprocess.run(
-                ['git', 'branch', '-r', '--format=%(refname:short)'],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                check=True
-            )
-            for branch_name in result.stdout.strip().split('\n'):
-                if not branch_name or ' -> ' in branch_name:
-                    continue
-                # Get full commit hash for this branch
-                hash_result = subprocess.run(
-                    ['git', 'rev-parse', f'{branch_name}^{{commit}}'],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    universal_newlines=True,
-                    check=True
-                )
-                commit_hash = hash_result.stdout.strip()
-                if commit_hash:
-                    self.branches.append((branch_name, 'remote', commit_hash))
-        except subprocess.CalledProcessError:
-            pass
+        for line in result.stdout.splitlines():
+            parts = line.split('\t')
+            if len(parts) != 5:
+                continue
+            # Symbolic refs such as origin/HEAD are listed with the commit they resolve to
+            refname, branch_name, commit_hash, obj_type, upstream = parts
+            branch_type = 'local' if refname.startswith('refs/heads/') else 'remote'
+            if obj_type == 'commit':
+                self.branches.append((branch_name, branch_type, commit_hash))
+            if branch_type == 'local' and upstream:
+                self.upstreams[branch_name] = upstream
     
     def get_all_tag_refs(self) -> None:
         """
@@ -138,29 +282,43 @@ class GitObjectGraphVisualizer:
         Stores results in self.tag_refs as (tag_name, commit_hash).
         """
         try:
+            # One for-each-ref call lists every tag with its target, peeled once for
+            # annotated tags, instead of one rev-parse per tag
             result = subprocess.run(
-                ['git', 'tag', '-l'],
+                ['git', 'for-each-ref',
+                 '--format=%(refname:strip=2)\t%(objecttype)\t%(objectname)\t%(*objecttype)\t%(*objectname)',
+                 'refs/tags'],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 universal_newlines=True,
                 check=True
             )
-            for tag_name in result.stdout.strip().split('\n'):
-                if not tag_name:
-                    continue
-                # Get the commit hash that this tag points to
+        except subprocess.CalledProcessError:
+            return
+
+        for line in result.stdout.splitlines():
+            parts = line.split('\t')
+            if len(parts) != 5:
+                continue
+            tag_name, obj_type, obj_hash, peeled_type, peeled_hash = parts
+            if obj_type == 'commit':
+                commit_hash = obj_hash
+            elif peeled_type == 'commit':
+                commit_hash = peeled_hash
+            elif peeled_type == 'tag':
+                # A tag of a tag; peel the rest of the chain with rev-parse
                 hash_result = subprocess.run(
-                    ['git', 'rev-parse', f'{tag_name}^{{commit}}'],
+                    ['git', 'rev-parse', '--verify', '-q', f'refs/tags/{tag_name}^{{commit}}'],
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
-                    universal_newlines=True,
-                    check=True
+                    universal_newlines=True
                 )
                 commit_hash = hash_result.stdout.strip()
-                if commit_hash:
-                    self.tag_refs.append((tag_name, commit_hash))
-        except subprocess.CalledProcessError:
-            pass
+            else:
+                # Tags of trees or blobs do not point to a commit
+                continue
+            if commit_hash:
+                self.tag_refs.append((tag_name, commit_hash))
 
     def get_index_entries(self) -> None:
         """
@@ -232,124 +390,123 @@ class GitObjectGraphVisualizer:
         except subprocess.CalledProcessError:
             pass
     
-    def get_object_type(self, git_hash: str) -> str:
-        """Get the type of a Git object."""
-        if git_hash in self.object_types:
-            return self.object_types[git_hash]
-        
-        try:
-            result = subprocess.run(
-                ['git', 'cat-file', '-t', git_hash],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                check=True
-            )
-            obj_type = result.stdout.strip()
-            self.object_types[git_hash] = obj_type
-            return obj_type
-        except subprocess.CalledProcessError:
-            return "unknown"
-    
-    def parse_commit(self, git_hash: str) -> List[Tuple[str, str]]:
+    def parse_commit(self, git_hash: str, content: bytes) -> List[Tuple[str, str]]:
         """
         Parse commit object and extract tree and parent references.
         Returns list of tuples: (ref_type, ref_hash)
         """
-        try:
-            result = subprocess.run(
-                ['git', 'cat-file', '-p', git_hash],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                check=True
-            )
-        except subprocess.CalledProcessError:
-            return []
-        
         refs = []
-        for line in result.stdout.split('\n'):
-            if line.startswith('tree '):
-                tree_hash = line.split()[1]
-                refs.append(('tree', tree_hash))
-            elif line.startswith('parent '):
-                parent_hash = line.split()[1]
-                refs.append(('parent', parent_hash))
+        # The tree and parent lines always open the header, so scanning stops at the
+        # first other line (author) and the rest of the commit is never split
+        pos = 0
+        while True:
+            end = content.find(b'\n', pos)
+            if end == -1:
+                end = len(content)
+            line = content[pos:end]
+            if line.startswith(b'tree '):
+                refs.append(('tree', line[5:].decode('ascii')))
+            elif line.startswith(b'parent '):
+                parent_hash = line[7:].decode('ascii')
+                # A parent listed twice would only produce overlapping arrows
+                if ('parent', parent_hash) not in refs:
+                    refs.append(('parent', parent_hash))
+            else:
+                break
+            pos = end + 1
         
         return refs
     
-    def parse_tree(self, git_hash: str) -> List[Tuple[str, str, str]]:
+    def parse_tree(self, git_hash: str, content: bytes) -> List[Tuple[str, str]]:
         """
-        Parse tree object and extract blob/tree references.
-        Returns list of tuples: (ref_type, ref_hash, name)
+        Parse tree object and extract blob/tree/submodule references.
+        Returns list of tuples: (ref_hash, name)
+        The child types are not needed, as every tree edge has the 'tree' relationship.
         Also stores names for child objects.
         """
-        try:
-            result = subprocess.run(
-                ['git', 'cat-file', '-p', git_hash],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                check=True
-            )
-        except subprocess.CalledProcessError:
-            return []
-        
+        # Raw tree format is a sequence of "mode name\0<binary hash>" entries
+        names = self._entry_names
+        hash_len = len(git_hash) // 2
         refs = []
-        for line in result.stdout.split('\n'):
-            if not line:
-                continue
-            # Parse output: mode type hash\tname
-            match = re.match(r'(?P<mode>\d+)\s+(?P<type>\w+)\s+(?P<hash>[a-f0-9]+)\s+(?P<name>.*)', line)
-            if match:
-                ref_type = match.group('type')
-                ref_hash = match.group('hash')
-                name = match.group('name')
-                # Store the name for this object
-                if ref_hash not in self.object_names:
-                    self.object_names[ref_hash] = name
-                refs.append((ref_type, ref_hash, name))
+        pos = 0
+        while pos < len(content):
+            space = content.index(b' ', pos)
+            nul = content.index(b'\0', space)
+            raw_name = content[space + 1:nul]
+            name = names.get(raw_name)
+            if name is None:
+                name = names[raw_name] = sys.intern(raw_name.decode('utf-8', 'replace'))
+            ref_hash = content[nul + 1:nul + 1 + hash_len].hex()
+            pos = nul + 1 + hash_len
+            # Store the name for this object; the key is interned so it shares the
+            # hash string from the object listing
+            if ref_hash not in self.object_names:
+                self.object_names[sys.intern(ref_hash)] = name
+            refs.append((ref_hash, name))
         
-        return refs  # type: ignore
+        return refs
     
-    def parse_tag(self, git_hash: str) -> List[Tuple[str, str]]:
+    def parse_tag(self, git_hash: str, content: bytes) -> List[Tuple[str, str]]:
         """
         Parse tag object and extract object reference.
         Also stores the tag name if available.
         Returns list of tuples: (ref_type, ref_hash)
         """
-        try:
-            result = subprocess.run(
-                ['git', 'cat-file', '-p', git_hash],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                check=True
-            )
-        except subprocess.CalledProcessError:
-            return []
-        
         refs = []
-        for line in result.stdout.split('\n'):
-            if line.startswith('object '):
-                obj_hash = line.split()[1]
+        # Only the header is of interest; it ends at the blank line before the message
+        header_end = content.find(b'\n\n')
+        if header_end != -1:
+            content = content[:header_end]
+        
+        # Work on the raw bytes; only the referenced hash and the tag name need decoding
+        for line in content.split(b'\n'):
+            if line.startswith(b'object '):
+                obj_hash = line.split()[1].decode('ascii')
                 refs.append(('object', obj_hash))
-            elif line.startswith('tag '):
-                tag_name = line.split(' ', 1)[1]
+            elif line.startswith(b'tag '):
+                tag_name = line.split(b' ', 1)[1].decode('utf-8', 'replace')
                 # Store the tag name for this tag object
                 if git_hash not in self.object_names:
                     self.object_names[git_hash] = tag_name
         
         return refs
     
+    def object_label(self, git_hash: str) -> str:
+        """
+        Create the node label for a Git object: shortened hash and optional name.
+        The label is already escaped for DOT.
+        """
+        # Only show name in node label for non-blob and non-tree objects;
+        # for blobs and trees, names are shown in edge labels instead
+        if self.object_types.get(git_hash) in ('blob', 'tree'):
+            return git_hash[:8]
+        name = self.object_names.get(git_hash, "")
+        return f"{git_hash[:8]}\\n{escape_label(name)}" if name else git_hash[:8]
+    
+    def add_edge(self, from_id: str, to_id: str, rel_type: str, edge_label: str = "") -> None:
+        """Add an edge between two nodes."""
+        self.edge_from.append(from_id)
+        self.edge_to.append(to_id)
+        self.edge_types.append(EDGE_TYPE_INDEX[rel_type])
+        self.edge_labels.append(edge_label)
+    
     def create_node_id(self, git_hash: str) -> str:
         """Create a unique node ID for Graphviz."""
-        return f"obj_{git_hash[:8]}"
+        # Cached, so all edges to an object share a single node ID string
+        node_id = self._node_ids.get(git_hash)
+        if node_id is None:
+            node_id = self._node_ids[git_hash] = f"obj_{git_hash[:8]}"
+        return node_id
     
     def create_branch_node(self, branch_name: str, branch_type: str) -> str:
         """Create a unique node ID for a branch. Replaces slashes and special chars."""
-        safe_name = re.sub(r'[^a-zA-Z0-9_]', '_', branch_name)
-        return f"branch_{branch_type}_{safe_name}"
+        # Cached, as process_branches asks for the same branches several times
+        key = (branch_name, branch_type)
+        node_id = self._branch_node_ids.get(key)
+        if node_id is None:
+            safe_name = UNSAFE_ID_CHARS.sub('_', branch_name)
+            node_id = self._branch_node_ids[key] = f"branch_{branch_type}_{safe_name}"
+        return node_id
     
     def process_branches(self) -> None:
         """
@@ -364,7 +521,7 @@ class GitObjectGraphVisualizer:
                 self.nodes[node_id] = ('branch', branch_name, branch_type)
                 
                 commit_node_id = self.create_node_id(commit_hash_or_ref)
-                self.edges.append((node_id, commit_node_id, branch_type, ""))
+                self.add_edge(node_id, commit_node_id, branch_type)
         
         # Then handle HEAD separately
         for branch_name, branch_type, commit_hash_or_ref in self.branches:
@@ -384,12 +541,12 @@ class GitObjectGraphVisualizer:
                         # Mark missing local branch so we can style it differently
                         self.nodes[target_node_id] = ('branch', target_branch, 'local_missing')
 
-                    self.edges.append((node_id, target_node_id, 'head', ""))
+                    self.add_edge(node_id, target_node_id, 'head')
                 elif commit_hash_or_ref.startswith('commit:'):
                     # HEAD is detached, pointing to a commit
                     commit_hash = commit_hash_or_ref.split(':', 1)[1]
                     commit_node_id = self.create_node_id(commit_hash)
-                    self.edges.append((node_id, commit_node_id, 'head', ""))
+                    self.add_edge(node_id, commit_node_id, 'head')
 
         # Add tracking edges for local branches that have an upstream configured.
         # Prefer linking to a remote branch node if present, otherwise link to any matching branch node.
@@ -412,7 +569,7 @@ class GitObjectGraphVisualizer:
                     target_node_id = upstream_remote_id
 
                 # Dashed arrow to indicate tracking relationship
-                self.edges.append((local_node_id, target_node_id, 'tracks', ""))
+                self.add_edge(local_node_id, target_node_id, 'tracks')
     
     def process_tag_refs(self) -> None:
         """
@@ -423,99 +580,71 @@ class GitObjectGraphVisualizer:
             self.nodes[node_id] = ('tag_ref', tag_name, 'tag_ref')
             
             commit_node_id = self.create_node_id(commit_hash)
-            self.edges.append((node_id, commit_node_id, 'tag_ref', ""))
+            self.add_edge(node_id, commit_node_id, 'tag_ref')
     
-    def scan_all_references(self, all_objects: List[str]) -> None:
+    def process_objects(self) -> None:
         """
-        First pass: scan all objects to populate object_names from tree and tag references.
-        This ensures names are discovered before processing individual objects.
+        Process Git objects: create edges for their references.
+        self.objects_by_type lists every object in the repository, so referenced
+        objects do not need to be followed; only commits, trees and tags are read,
+        through the cat-file process. The object nodes themselves are taken from
+        self.objects_by_type in generate_graphviz, once every object name is known.
         """
-        print("Scanning object references to discover names...", file=sys.stderr)
-        for i, obj_hash in enumerate(all_objects, 1):
+        # Only commits, trees and tags reference other objects; blobs (usually the
+        # majority) are never read or dispatched
+        by_type = self.objects_by_type
+        parsed_hashes = by_type.get('commit', []) + by_type.get('tree', []) + by_type.get('tag', [])
+        for i, (git_hash, obj_type, content) in enumerate(self._cat_many(parsed_hashes), 1):
             if i % 100 == 0:
-                print(f"  Scanned {i}/{len(all_objects)} objects...", file=sys.stderr)
+                print(f"  Processed {i}/{len(parsed_hashes)} objects...", file=sys.stderr)
+            
+            node_id = self.create_node_id(git_hash)
             
-            obj_type = self.get_object_type(obj_hash)
             if obj_type == 'tree':
-                # Parse tree to extract child names
-                self.parse_tree(obj_hash)
-            elif obj_type == 'tag':
-                # Parse tag to extract tag name
-                self.parse_tag(obj_hash)
-    
-    def process_object(self, git_hash: str) -> None:
-        """Process a single Git object and extract its references."""
-        if git_hash in self.visited:
-            return
-        
-        self.visited.add(git_hash)
-        
-        obj_type = self.get_object_type(git_hash)
-        node_id = self.create_node_id(git_hash)
-        
-        # Get name if available; for blobs and trees, names will be in edge labels instead
-        name = self.object_names.get(git_hash, "")
-        # Only show name in node label for non-blob and non-tree objects
-        if obj_type in ('blob', 'tree'):
-            label = git_hash[:8]
-        else:
-            label = f"{git_hash[:8]}\n{name}" if name else git_hash[:8]
-        
-        # Create node with shortened hash and optional name as label
-        self.nodes[node_id] = (obj_type, label, name)
-        
-        # Extract references based on object type
-        refs = []
-        if obj_type == 'commit':
-            refs = self.parse_commit(git_hash)
-        elif obj_type == 'tree':
-            refs = self.parse_tree(git_hash)
-        elif obj_type == 'tag':
-            refs = self.parse_tag(git_hash)
-        
-        # Process references and create edges
-        for ref_data in refs:
-            if obj_type == 'tree' and len(ref_data) == 3:
-                # Tree references include name: (ref_type, ref_hash, name)
-                # Note: ref_type here is the child's type (blob, tree), but the edge relationship is 'tree'
-                ref_type, ref_hash, edge_label = ref_data
-                edge_rel_type = 'tree'
-            else:
-                # Other references: (ref_type, ref_hash)
-                if len(ref_data) >= 2:
-                    ref_type, ref_hash = ref_data[0], ref_data[1]
-                else:
-                    continue
-                edge_label = ""
-                edge_rel_type = ref_type
+                # Tree entries label their edge with the blob/tree name
+                for ref_hash, name in self.parse_tree(git_hash, content):
+                    self.add_edge(node_id, self.create_node_id(ref_hash), 'tree', name)
+                continue
             
-            ref_node_id = self.create_node_id(ref_hash)
-            self.edges.append((node_id, ref_node_id, edge_rel_type, edge_label))
-            # Recursively process referenced objects
-            self.process_object(ref_hash)
+            # Other references are (ref_type, ref_hash); the type is the relationship
+            refs = []
+            if obj_type == 'commit':
+                refs = self.parse_commit(git_hash, content)
+            elif obj_type == 'tag':
+                refs = self.parse_tag(git_hash, content)
+            for ref_type, ref_hash in refs:
+                self.add_edge(node_id, self.create_node_id(ref_hash), ref_type)
     
-    def generate_graphviz(self) -> str:
-        """Generate Graphviz DOT format output."""
-        dot_lines = [
-            'digraph gitobjects {',
-            '  rankdir=LR;',
-            '  splines=line;',
-            '  node [shape=box, style="rounded,filled"];',
-            '',
-            '  // Edge styling',
-            '  edge [color=gray];',
-            ''
-        ]
-        
-        # Define node styles by type
-        branch_nodes = [nid for nid, (ntype, _, _) in self.nodes.items() if ntype == 'branch']
-        head_nodes = [nid for nid, (ntype, _, btype) in self.nodes.items() if ntype == 'branch' and btype == 'head']
-        ref_nodes = [nid for nid in branch_nodes if nid not in head_nodes]  # branches excluding HEAD
-        tag_ref_nodes = [nid for nid, (ntype, _, _) in self.nodes.items() if ntype == 'tag_ref']
-        commit_nodes = [nid for nid, (ntype, _, _) in self.nodes.items() if ntype == 'commit']
-        tree_nodes = [nid for nid, (ntype, _, _) in self.nodes.items() if ntype == 'tree']
-        blob_nodes = [nid for nid, (ntype, _, _) in self.nodes.items() if ntype == 'blob']
-        tag_nodes = [nid for nid, (ntype, _, _) in self.nodes.items() if ntype == 'tag']
+    def generate_graphviz(self, out: TextIO) -> None:
+        """
+        Generate Graphviz DOT format output.
+        The output is written to `out` line by line instead of being built in memory.
+        """
+        write = out.write
+        write('digraph gitobjects {\n'
+              '  rankdir=LR;\n'
+              '  splines=line;\n'
+              '  node [shape=box, style="rounded,filled"];\n'
+              '\n'
+              '  // Edge styling\n'
+              '  edge [color=gray];\n'
+              '\n')
+        
+        # Group reference node IDs by type in a single pass; git objects are
+        # already grouped by type in self.objects_by_type
+        typed_nodes: Dict[str, List[str]] = {'branch': [], 'tag_ref': []}
+        head_nodes = []
+        ref_nodes = []  # branches excluding HEAD
+        for node_id, (node_type, _, branch_type) in self.nodes.items():
+            section_nodes = typed_nodes.get(node_type)
+            if section_nodes is not None:
+                section_nodes.append(node_id)
+            if node_type == 'branch':
+                (head_nodes if branch_type == 'head' else ref_nodes).append(node_id)
+        branch_nodes = typed_nodes['branch']
+        tag_ref_nodes = typed_nodes['tag_ref']
+        create_node_id = self.create_node_id
+        tag_nodes = [create_node_id(h) for h in self.objects_by_type.get('tag', [])]
 
         # If we have index entries, render an HTML table node
         if self.index_entries:
@@ -534,35 +663,16 @@ class GitObjectGraphVisualizer:
                           ''.join(rows) +
                           '</TABLE>')
 
-            dot_lines.append('  // Git index (staged files)')
-            dot_lines.append(f'  index_table [shape=plaintext, margin=0, label=<{table_html}>];')
+            write('  // Git index (staged files)\n')
+            write(f'  index_table [shape=plaintext, margin=0, label=<{table_html}>];\n')
         
         if branch_nodes:
-            dot_lines.append('  // Branch nodes')
+            write('  // Branch nodes\n')
             for node_id in branch_nodes:
                 _, label, branch_type = self.nodes[node_id]
-                if branch_type == 'local':
-                    dot_lines.append(
-                        f'  {node_id} [label="{label}", fillcolor="#FFB6C1", shape="cds"];'
-                    )
-                elif branch_type == 'remote':
-                    dot_lines.append(
-                        f'  {node_id} [label="{label}", fillcolor="#DDA0DD", shape="cds"];'
-                    )
-                elif branch_type == 'head':
-                    dot_lines.append(
-                        f'  {node_id} [label="{label}", fillcolor="#FF6347", shape="cds", penwidth="3"];'
-                    )
-                elif branch_type == 'local_missing':
-                    # Visualize missing (non-existent) local branch with dashed outline
-                    dot_lines.append(
-                        f'  {node_id} [label="{label}", fillcolor="#FFEFD5", shape="cds", style="dashed,filled"];'
-                    )
-                elif branch_type == 'remote_missing':
-                    # Visualize missing remote branch with dashed outline (different tint)
-                    dot_lines.append(
-                        f'  {node_id} [label="{label}", fillcolor="#FFF0F5", shape="cds", style="dashed,filled"];'
-                    )
+                style = BRANCH_STYLES.get(branch_type)
+                if style:
+                    write(f'  {node_id} [label="{escape_label(label)}", {style}];\n')
             
             # Rank HEAD, tag references, tag objects and index at the top level
             head_group = head_nodes + tag_ref_nodes + tag_nodes
@@ -570,132 +680,64 @@ class GitObjectGraphVisualizer:
                 # include index_table node id
                 head_group = ['index_table'] + head_group
             if head_group:
-                dot_lines.append(f'  {{rank=same; {" ".join(head_group)}}}')
+                write(f'  {{rank=same; {" ".join(head_group)}}}\n')
             
             # Rank other branches at the same level (below HEAD and tags)
             if ref_nodes:
-                dot_lines.append(f'  {{rank=same; {" ".join(ref_nodes)}}}')
+                write(f'  {{rank=same; {" ".join(ref_nodes)}}}\n')
                 
         if tag_ref_nodes:
-            dot_lines.append('  // Tag references')
+            write('  // Tag references\n')
+            suffix = NODE_SUFFIXES['tag_ref']
             for node_id in tag_ref_nodes:
                 _, label, _ = self.nodes[node_id]
-                dot_lines.append(
-                    f'  {node_id} [label="{label}", fillcolor="#FF69B4", shape="cds"];'
-                )
-        
-        if tag_nodes:
-            dot_lines.append('  // Tag objects')
-            for node_id in tag_nodes:
-                _, label, _ = self.nodes[node_id]
-                dot_lines.append(
-                    f'  {node_id} [label="{label}", fillcolor="#FF69B4", shape="note"];'
-                )
-        
-        if commit_nodes:
-            dot_lines.append('  // Commit objects')
-            for node_id in commit_nodes:
-                _, label, _ = self.nodes[node_id]
-                dot_lines.append(
-                    f'  {node_id} [label="{label}", fillcolor="#FFD700", shape="ellipse"];'
-                )
-            # Rank commits at the same level
-            dot_lines.append(f'  {{rank=same; {" ".join(commit_nodes)}}}')
-        
-        if tree_nodes:
-            dot_lines.append('  // Tree objects')
-            for node_id in tree_nodes:
-                _, label, _ = self.nodes[node_id]
-                dot_lines.append(
-                    f'  {node_id} [label="{label}", fillcolor="#90EE90", shape="folder"];'
-                )
-        
-        if blob_nodes:
-            dot_lines.append('  // Blob objects')
-            for node_id in blob_nodes:
-                _, label, _ = self.nodes[node_id]
-                dot_lines.append(
-                    f'  {node_id} [label="{label}", fillcolor="#87CEEB", shape="cylinder"];'
-                )
-            # Rank blobs at the same level
-            dot_lines.append(f'  {{rank=same; {" ".join(blob_nodes)}}}')
+                write(f'  {node_id} [label="{escape_label(label)}{suffix}')
         
+        for obj_type, comment, same_rank in OBJECT_SECTIONS:
+            section_hashes = self.objects_by_type.get(obj_type)
+            if not section_hashes:
+                continue
+            write(f'  // {comment}\n')
+            suffix = NODE_SUFFIXES[obj_type]
+            section_nodes = []
+            for git_hash in section_hashes:
+                node_id = create_node_id(git_hash)
+                section_nodes.append(node_id)
+                write(f'  {node_id} [label="{self.object_label(git_hash)}{suffix}')
+            if same_rank:
+                write(f'  {{rank=same; {" ".join(section_nodes)}}}\n')
         
         # Add edges with labels
-        if self.edges:
-            dot_lines.append('')
-            dot_lines.append('  // Relationships')
-            for edge_data in self.edges:
-                # Handle both old 3-tuple and new 4-tuple edge formats
-                if len(edge_data) == 4:
-                    from_id, to_id, rel_type, edge_label = edge_data
+        if self.edge_from:
+            write('\n')
+            write('  // Relationships\n')
+            for from_id, to_id, rel_index, edge_label in zip(
+                    self.edge_from, self.edge_to, self.edge_types, self.edge_labels):
+                plain_suffix, label_suffix = EDGE_SUFFIXES[rel_index]
+                if edge_label:
+                    # Tree edges carry the blob/tree name as label
+                    write(f'  {from_id} -> {to_id} [label="{escape_label(edge_label)}{label_suffix}')
                 else:
-                    from_id, to_id, rel_type = edge_data
-                    edge_label = ""
-                
-                if rel_type == 'parent':
-                    dot_lines.append(
-                        f'  {from_id} -> {to_id} [label="parent", color="red"];'
-                    )
-                elif rel_type == 'tree':
-                    # For tree edges, include the blob/tree name if provided
-                    if edge_label:
-                        dot_lines.append(
-                            f'  {from_id} -> {to_id} [label="{edge_label}", color="green"];'
-                        )
-                    else:
-                        dot_lines.append(
-                            f'  {from_id} -> {to_id} [color="green"];'
-                        )
-                elif rel_type == 'object':
-                    dot_lines.append(
-                        f'  {from_id} -> {to_id} [label="tag (obj)", color="purple"];'
-                    )
-                elif rel_type == 'local':
-                    dot_lines.append(
-                        f'  {from_id} -> {to_id} [label="local", color="orange"];'
-                    )
-                elif rel_type == 'remote':
-                    dot_lines.append(
-                        f'  {from_id} -> {to_id} [label="remote", color="brown"];'
-                    )
-                elif rel_type == 'local_missing':
-                    dot_lines.append(
-                        f'  {from_id} -> {to_id} [label="local (missing)", color="orange", style="dashed"];'
-                    )
-                elif rel_type == 'head':
-                    dot_lines.append(
-                        f'  {from_id} -> {to_id} [color="red", penwidth="2"];'
-                    )
-                elif rel_type == 'tracks':
-                    dot_lines.append(
-                        f'  {from_id} -> {to_id} [label="tracks", style="dashed", color="black"];'
-                    )
-                elif rel_type == 'tag_ref':
-                    dot_lines.append(
-                        f'  {from_id} -> {to_id} [label="tag (ref)", color="purple"];'
-                    )
-                else:
-                    dot_lines.append(f'  {from_id} -> {to_id};')
+                    write(f'  {from_id} -> {to_id}{plain_suffix}')
         
-        dot_lines.append('}')
-        return '\n'.join(dot_lines)
+        write('}\n')
     
-    def visualize(self, output_file: str = None, dot_output_file: str = None) -> str:
+    def visualize(self, output_file: str = None, dot_output_file: str = None) -> None:
         """
         Perform the full visualization process.
-        Returns the Graphviz DOT content and optionally writes to file.
-        Runs dot to generate SVG output if dot_output_file is specified.
+        Writes the Graphviz DOT content to output_file if specified.
+        Runs dot to generate SVG output if dot_output_file is specified,
+        otherwise prints the DOT content to stdout.
         """
         # Get all git objects
         print("Scanning git repository for all objects...", file=sys.stderr)
-        all_objects = self.get_all_git_objects()
+        self.get_all_git_objects()
         
-        if not all_objects:
+        if not self.object_types:
             print("Error: No git objects found", file=sys.stderr)
             sys.exit(1)
         
-        print(f"Found {len(all_objects)} git objects", file=sys.stderr)
+        print(f"Found {len(self.object_types)} git objects", file=sys.stderr)
         
         # Get all branches and HEAD
         print("Scanning git branches and HEAD...", file=sys.stderr)
@@ -705,15 +747,13 @@ class GitObjectGraphVisualizer:
         # Collect index entries (staged files) for optional display
         self.get_index_entries()
         
-        # First pass: scan all tree objects to discover names
-        self.scan_all_references(all_objects)
-        
-        # Process all objects
-        print("Processing objects and building graph...", file=sys.stderr)
-        for i, obj_hash in enumerate(all_objects, 1):
-            if i % 100 == 0:
-                print(f"  Processed {i}/{len(all_objects)} objects...", file=sys.stderr)
-            self.process_object(obj_hash)
+        try:
+            # Process all objects
+            print("Processing objects and building graph...", file=sys.stderr)
+            self.process_objects()
+        finally:
+            # Object contents are no longer needed once the graph is built
+            self.close()
         
         # Process branches
         print("Adding branches to graph...", file=sys.stderr)
@@ -723,38 +763,70 @@ class GitObjectGraphVisualizer:
         print("Adding tag references to graph...", file=sys.stderr)
         self.process_tag_refs()
         
-        print(f"Graph contains {len(self.nodes)} nodes and {len(self.edges)} edges",
+        print(f"Graph contains {len(self.nodes) + len(self.object_types)} nodes and {len(self.edge_from)} edges",
               file=sys.stderr)
         
-        # Generate Graphviz output
-        dot_content = self.generate_graphviz()
-        
-        # Write to file if specified
-        if output_file:
-            Path(output_file).write_text(dot_content)
-            print(f"Graphviz file written to: {output_file}", file=sys.stderr)
-        
-        # Run dot to generate SVG if dot_output_file is specified
+        # Stream the DOT output to all of its destinations at once
+        sinks = []
+        dot_file = None
+        dot_proc = None
+        dot_missing = False
         if dot_output_file:
+            # Start dot before anything is written, so a missing Graphviz does not
+            # leave a truncated DOT file; dot is fed while the graph is generated
             print(f"Generating SVG with dot...", file=sys.stderr)
             try:
-                result = subprocess.run(
+                dot_proc = subprocess.Popen(
                     ['dot', '-Tsvg', f'-o{dot_output_file}'],
-                    input=dot_content,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    universal_newlines=True,
-                    check=True
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.DEVNULL,
+                    universal_newlines=True
                 )
-                print(f"SVG file written to: {dot_output_file}", file=sys.stderr)
-            except subprocess.CalledProcessError as e:
-                print(f"Error running dot: {e.stderr}", file=sys.stderr)
-                sys.exit(1)
             except FileNotFoundError:
-                print("Error: 'dot' command not found. Please install Graphviz.", file=sys.stderr)
-                sys.exit(1)
+                dot_missing = True
+        if output_file:
+            dot_file = open(output_file, 'w')
+            sinks.append(dot_file)
+        if dot_proc:
+            sinks.append(dot_proc.stdin)
+        elif not dot_output_file:
+            # Only print DOT to stdout if SVG generation is disabled
+            sinks.append(sys.stdout)
+        
+        dot_file_complete = False
+        if sinks:
+            writer = sinks[0] if len(sinks) == 1 else _TeeWriter(sinks)
+            try:
+                self.generate_graphviz(writer)
+                # The tee drops dot's input if dot exits early, but keeps writing the file
+                dot_file_complete = dot_file is not None and (
+                    writer is dot_file or dot_file in writer.streams)
+            except BrokenPipeError:
+                # dot exited early; its exit status is reported below
+                if dot_proc is None:
+                    raise
+            finally:
+                if dot_file:
+                    dot_file.close()
+                if dot_proc:
+                    try:
+                        dot_proc.stdin.close()
+                    except BrokenPipeError:
+                        pass
+        
+        if dot_file_complete:
+            print(f"Graphviz file written to: {output_file}", file=sys.stderr)
+        elif output_file:
+            print(f"Error: Graphviz file {output_file} is incomplete", file=sys.stderr)
         
-        return dot_content
+        if dot_missing:
+            print("Error: 'dot' command not found. Please install Graphviz.", file=sys.stderr)
+            sys.exit(1)
+        if dot_proc:
+            if dot_proc.wait() != 0:
+                print(f"Error running dot: exit status {dot_proc.returncode}", file=sys.stderr)
+                sys.exit(1)
+            print(f"SVG file written to: {dot_output_file}", file=sys.stderr)
 
 
 def main():
@@ -774,11 +846,7 @@ def main():
         output_file = sys.argv[2]
     
     visualizer = GitObjectGraphVisualizer()
-    dot_content = visualizer.visualize(output_file, dot_output_file)
-    
-    # Only print DOT to stdout if SVG generation is disabled
-    if not dot_output_file:
-        print(dot_content)
+    visualizer.visualize(output_file, dot_output_file)
 
 
 if __name__ == '__main__':